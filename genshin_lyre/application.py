@@ -13,18 +13,87 @@ from .key_mapper import KeyMapper
 from .key_sender import KeySender
 from .midi_player import MidiPlayer
 
+# Custom CSS styling, loaded once at startup
+_CSS = """
+.title-1 {
+    font-size: 24px;
+    font-weight: bold;
+}
+
+.title-2 {
+    font-size: 18px;
+    font-weight: bold;
+}
+
+.title-3 {
+    font-size: 14px;
+    font-weight: bold;
+}
+
+.dim-label {
+    opacity: 0.6;
+}
+
+.monospace {
+    font-family: monospace;
+}
+
+.success {
+    color: #4caf50;
+}
+
+.error {
+    color: #f44336;
+}
+
+.warning {
+    color: #ff9800;
+}
+
+.circular {
+    border-radius: 9999px;
+    min-width: 40px;
+    min-height: 40px;
+}
+
+.pill {
+    border-radius: 20px;
+    padding: 8px 24px;
+}
+
+notebook tab {
+    padding: 8px 16px;
+}
+
+/* Notes viewer key, lit via the CHECKED state flag while its note sounds */
+.lyrekey:checked {
+    background: @theme_selected_bg_color;
+    color: @theme_selected_fg_color;
+}
+"""
+_CSS_BYTES = _CSS.encode()
+
+# Quiet period before a spin row's value is applied, so holding an arrow
+# doesn't rebuild the mapping or merge schedule on every step
+SPIN_APPLY_DELAY_MS = 150
+
+# Settings keys edited with spin rows, whose side effects are debounced
+_DEBOUNCED_KEYS = frozenset(('transpose', 'merge_threshold_ms'))
+
 
 class LyreApplication:
     """Main application class managing all components."""
     
     def __init__(self):
-        self.gtk_app = Gtk.Application(
+        # Adw.Application initializes libadwaita (styles for the Adw widgets) on startup
+        self.gtk_app = Adw.Application(
             application_id='com.genshin.lyreplayer',
             flags=Gio.ApplicationFlags.DEFAULT_FLAGS
         )
         
         self.gtk_app.connect('activate', self._on_activate)
         self.gtk_app.connect('startup', self._on_startup)
+        self.gtk_app.connect('shutdown', self._on_shutdown)
         
         # Components (initialized in startup)
         self.settings = None
@@ -32,6 +101,9 @@ class LyreApplication:
         self.key_sender = None
         self.midi_player = None
         self.main_window = None
+        
+        # Settings key -> GLib source id of a debounced side effect
+        self._pending_apply = {}
     
     def _on_startup(self, app):
         """Handle application startup."""
@@ -43,10 +115,26 @@ class LyreApplication:
         )
         self.key_sender = KeySender()
         self.midi_player = MidiPlayer(self.key_mapper, self.key_sender)
+        self.midi_player.set_merge_enabled(
+            self.settings.merge_nearby_notes,
+            self.settings.get('merge_threshold_ms', 50)
+        )
+        
+        # Settings changes reach the player, key mapper and theme whether or
+        # not the Settings tab has been built
+        self._side_effects = {
+            'keyboard_layout': self.key_mapper.set_layout,
+            'transpose': self.key_mapper.set_transpose,
+            'merge_nearby_notes': self._apply_merge,
+            'merge_threshold_ms': self._apply_threshold,
+            'theme': self.apply_theme,
+        }
+        self.settings.on_changed = self._on_setting_changed
         
         # Set up playback callbacks
         self.midi_player.on_playback_finished = self._on_playback_finished
         self.midi_player.on_note_played = self._on_note_played
+        self.midi_player.on_position_changed = self._on_position_changed
         
         # Set up actions
         self._setup_actions()
@@ -57,6 +145,11 @@ class LyreApplication:
         # Apply theme
         self.apply_theme(self.settings.theme)
     
+    def _on_shutdown(self, app):
+        """Handle application shutdown."""
+        if self.key_sender:
+            self.key_sender.close()
+    
     def _on_activate(self, app):
         """Handle application activation."""
         if self.main_window is None:
@@ -79,64 +172,18 @@ class LyreApplication:
     
     def _load_css(self):
         """Load custom CSS styling."""
-        css_provider = Gtk.CssProvider()
-        
-        css = """
-        .title-1 {
-            font-size: 24px;
-            font-weight: bold;
-        }
-        
-        .title-2 {
-            font-size: 18px;
-            font-weight: bold;
-        }
-        
-        .title-3 {
-            font-size: 14px;
-            font-weight: bold;
-        }
+        display = Gdk.Display.get_default()
+        if display is None:
+            return
         
-        .dim-label {
-            opacity: 0.6;
-        }
-        
-        .monospace {
-            font-family: monospace;
-        }
-        
-        .success {
-            color: #4caf50;
-        }
-        
-        .error {
-            color: #f44336;
-        }
-        
-        .warning {
-            color: #ff9800;
-        }
-        
-        .circular {
-            border-radius: 9999px;
-            min-width: 40px;
-            min-height: 40px;
-        }
-        
-        .pill {
-            border-radius: 20px;
-            padding: 8px 24px;
-        }
-        
-        notebook tab {
-            padding: 8px 16px;
-        }
-        """
-        
-        css_provider.load_from_data(css.encode())
+        css_provider = Gtk.CssProvider()
+        if hasattr(css_provider, 'load_from_string'):  # GTK 4.12+
+            css_provider.load_from_string(_CSS)
+        else:
+            css_provider.load_from_data(_CSS_BYTES)
         
         Gtk.StyleContext.add_provider_for_display(
-            Gdk.Display.get_default(),
+            display,
             css_provider,
             Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
         )
@@ -149,6 +196,37 @@ class LyreApplication:
         else:
             style_manager.set_color_scheme(Adw.ColorScheme.FORCE_LIGHT)
     
+    def _on_setting_changed(self, key, value):
+        """Apply side effects of a changed setting, whatever changed it."""
+        apply = self._side_effects.get(key)
+        if apply is None:
+            return
+        
+        if key in _DEBOUNCED_KEYS:
+            source_id = self._pending_apply.pop(key, None)
+            if source_id:
+                GLib.source_remove(source_id)
+            self._pending_apply[key] = GLib.timeout_add(
+                SPIN_APPLY_DELAY_MS, self._run_pending_apply, key, apply)
+        else:
+            apply(value)
+    
+    def _run_pending_apply(self, key, apply):
+        """Apply the latest stored value once a spin row has settled."""
+        del self._pending_apply[key]
+        apply(self.settings.get(key))
+        return GLib.SOURCE_REMOVE
+    
+    def _apply_merge(self, active):
+        """Enable or disable note merging."""
+        threshold = self.settings.get('merge_threshold_ms', 50)
+        self.midi_player.set_merge_enabled(active, threshold)
+    
+    def _apply_threshold(self, value):
+        """Apply a new merge threshold if merging is on."""
+        if self.settings.merge_nearby_notes:
+            self.midi_player.set_merge_enabled(True, value)
+    
     def _on_about(self, action, param):
         """Show about dialog."""
         about = Gtk.AboutDialog()
@@ -163,6 +241,7 @@ class LyreApplication:
     def _on_quit(self, action, param):
         """Handle quit action."""
         self.midi_player.stop()
+        self.key_sender.close()
         self.gtk_app.quit()
     
     def _on_playback_finished(self):
@@ -175,6 +254,11 @@ class LyreApplication:
         if self.main_window:
             self.main_window.player_tab.on_note_played(note)
     
+    def _on_position_changed(self, position_ms):
+        """Handle position callback - forward to player tab for the timeline."""
+        if self.main_window:
+            self.main_window.player_tab.on_position_changed(position_ms)
+    
     def run(self, args=None):
         """Run the application."""
         import sys
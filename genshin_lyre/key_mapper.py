@@ -3,7 +3,8 @@ Key mapping module for Genshin Impact Lyre.
 Maps MIDI notes to keyboard keys for different keyboard layouts.
 """
 
-from typing import Optional, Dict
+import functools
+from typing import Callable, Dict, Optional, Tuple
 
 # Base MIDI note mappings for Genshin Lyre (3 octaves: C3-B5)
 # Ported from Program.cs
@@ -40,6 +41,11 @@ KEYBOARD_LAYOUTS = {
     ],
 }
 
+# Immutable per-layout key tuples, shared by every caller of get_all_keys()
+_LAYOUT_TUPLES: Dict[str, Tuple[str, ...]] = {
+    name: tuple(keys) for name, keys in KEYBOARD_LAYOUTS.items()
+}
+
 # Note names for UI display
 NOTE_NAMES = [
     'C3', 'D3', 'E3', 'F3', 'G3', 'A3', 'B3',  # Row 1
@@ -52,6 +58,46 @@ VALID_MIDI_NOTES = set(BASE_NOTE_MAP.keys())
 MIN_MIDI_NOTE = min(VALID_MIDI_NOTES)
 MAX_MIDI_NOTE = max(VALID_MIDI_NOTES)
 
+# Number of possible MIDI note numbers (0-127)
+MIDI_NOTE_COUNT = 128
+
+# Untransposed note-to-key table per layout, indexed by MIDI note number
+_LAYOUT_LUTS: Dict[str, Tuple[Optional[str], ...]] = {}
+for _layout, _keys in KEYBOARD_LAYOUTS.items():
+    _lut = [None] * MIDI_NOTE_COUNT
+    for _midi_note, _key_index in BASE_NOTE_MAP.items():
+        _lut[_midi_note] = _keys[_key_index]
+    _LAYOUT_LUTS[_layout] = tuple(_lut)
+del _layout, _keys, _lut, _midi_note, _key_index
+
+
+@functools.lru_cache(maxsize=None)
+def _build_transposed_luts(layout: str, transpose: int) -> Tuple[tuple, tuple]:
+    """
+    Build the exact and octave-clamped lookup tables for a layout.
+    
+    Returns:
+        (exact, clamped) tuples of keys indexed by MIDI note number
+    """
+    base = _LAYOUT_LUTS[layout]
+    exact = tuple(
+        base[note + transpose] if 0 <= note + transpose < MIDI_NOTE_COUNT else None
+        for note in range(MIDI_NOTE_COUNT)
+    )
+    
+    # Out-of-range notes are folded by octaves into the playable range
+    low = MIN_MIDI_NOTE - transpose
+    high = MAX_MIDI_NOTE - transpose
+    clamped = []
+    for note in range(MIDI_NOTE_COUNT):
+        while note > high:
+            note -= 12
+        while note < low:
+            note += 12
+        clamped.append(exact[note])
+    
+    return exact, tuple(clamped)
+
 
 class KeyMapper:
     """Maps MIDI notes to keyboard keys with transposition and layout support."""
@@ -67,27 +113,33 @@ class KeyMapper:
         self.layout = layout if layout in KEYBOARD_LAYOUTS else 'QWERTY'
         self.transpose = max(-12, min(12, transpose))
         self._build_note_map()
+        
+        # Called after the layout or transposition changes
+        self.on_mapping_changed: Optional[Callable[[], None]] = None
     
     def _build_note_map(self) -> None:
-        """Build the note-to-key mapping based on current settings."""
-        keys = KEYBOARD_LAYOUTS[self.layout]
-        self._note_map: Dict[int, str] = {}
-        
-        for midi_note, key_index in BASE_NOTE_MAP.items():
-            # Apply transposition
-            transposed_note = midi_note - self.transpose
-            self._note_map[transposed_note] = keys[key_index]
+        """Select the note-to-key lookup tables for the current settings."""
+        self._note_lut, self._note_lut_clamped = _build_transposed_luts(
+            self.layout, self.transpose
+        )
     
     def set_layout(self, layout: str) -> None:
         """Change the keyboard layout."""
         if layout in KEYBOARD_LAYOUTS:
             self.layout = layout
             self._build_note_map()
+            self._notify_mapping_changed()
     
     def set_transpose(self, transpose: int) -> None:
         """Change the transposition amount."""
         self.transpose = max(-12, min(12, transpose))
         self._build_note_map()
+        self._notify_mapping_changed()
+    
+    def _notify_mapping_changed(self) -> None:
+        """Invoke the mapping-changed callback, if any."""
+        if self.on_mapping_changed:
+            self.on_mapping_changed()
     
     def get_key(self, midi_note: int, clamp: bool = False) -> Optional[str]:
         """
@@ -100,22 +152,15 @@ class KeyMapper:
         Returns:
             Key string or None if note is out of range
         """
-        if midi_note in self._note_map:
-            return self._note_map[midi_note]
-        
-        if clamp:
-            # Find the closest valid note
-            while midi_note > MAX_MIDI_NOTE + self.transpose:
-                midi_note -= 12
-            while midi_note < MIN_MIDI_NOTE + self.transpose:
-                midi_note += 12
-            return self._note_map.get(midi_note)
-        
+        if 0 <= midi_note < MIDI_NOTE_COUNT:
+            if clamp:
+                return self._note_lut_clamped[midi_note]
+            return self._note_lut[midi_note]
         return None
     
-    def get_all_keys(self) -> list:
-        """Get all keys in the current layout."""
-        return KEYBOARD_LAYOUTS[self.layout].copy()
+    def get_all_keys(self) -> Tuple[str, ...]:
+        """Get all keys in the current layout (shared tuple; copy before mutating)."""
+        return _LAYOUT_TUPLES[self.layout]
     
     def get_key_for_index(self, index: int) -> str:
         """Get the key at a specific index (0-20)."""
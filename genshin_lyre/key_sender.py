@@ -1,47 +1,218 @@
 """
 Key sender module for Genshin Impact Lyre.
-Sends keyboard input using xdotool.
+Sends keyboard input using libxdo, falling back to the xdotool command.
 """
 
+import ctypes
+import ctypes.util
+import queue
+import shutil
 import subprocess
 import threading
+import time
 from typing import Optional
 
+# libxdo's CURRENTWINDOW: send to whichever window has focus
+XDO_CURRENT_WINDOW = 0
+# Microseconds between key down/up events inside a key sequence; matches
+# xdotool's default --delay of 12 ms so both backends hold keys equally long
+XDO_KEY_DELAY_US = 12000
+
+# How long an is_genshin_focused() answer is reused before asking xdotool again
+FOCUS_CACHE_TTL_S = 0.1
+
+# Common window titles for Genshin Impact
+GENSHIN_TITLES = ('genshin impact', 'genshin', '原神')
+
+
+def _load_libxdo() -> Optional[ctypes.CDLL]:
+    """Load libxdo through ctypes, or return None if it isn't installed."""
+    for name in ('libxdo.so.3', ctypes.util.find_library('xdo')):
+        if not name:
+            continue
+        try:
+            lib = ctypes.CDLL(name)
+        except OSError:
+            continue
+        
+        lib.xdo_new.argtypes = [ctypes.c_char_p]
+        lib.xdo_new.restype = ctypes.c_void_p
+        lib.xdo_free.argtypes = [ctypes.c_void_p]
+        lib.xdo_free.restype = None
+        lib.xdo_send_keysequence_window.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_char_p, ctypes.c_uint
+        ]
+        lib.xdo_send_keysequence_window.restype = ctypes.c_int
+        # Modifier save/clear/restore, as xdotool's --clearmodifiers does
+        try:
+            lib.xdo_get_active_modifiers.argtypes = [
+                ctypes.c_void_p, ctypes.POINTER(ctypes.c_void_p), ctypes.POINTER(ctypes.c_int)
+            ]
+            lib.xdo_get_active_modifiers.restype = ctypes.c_int
+            for func in (lib.xdo_clear_active_modifiers, lib.xdo_set_active_modifiers):
+                func.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_void_p, ctypes.c_int]
+                func.restype = ctypes.c_int
+        except AttributeError:
+            continue  # Too old to clear modifiers; use xdotool instead
+        
+        # libc's free(), for the modifier list xdo_get_active_modifiers allocates
+        lib.libc_free = ctypes.CDLL(None).free
+        lib.libc_free.argtypes = [ctypes.c_void_p]
+        lib.libc_free.restype = None
+        return lib
+    return None
+
+
+# Resolved xdotool path; stays None until a lookup finds it
+_XDOTOOL_PATH: Optional[str] = None
+
+
+def _find_xdotool() -> Optional[str]:
+    """Resolve the xdotool executable, reusing the path once it has been found."""
+    global _XDOTOOL_PATH
+    if _XDOTOOL_PATH is None:
+        # A miss isn't cached, so installing xdotool mid-session takes effect
+        _XDOTOOL_PATH = shutil.which('xdotool')
+    return _XDOTOOL_PATH
+
 
 class KeySender:
-    """Sends keyboard input using xdotool."""
+    """Sends keyboard input using libxdo or xdotool."""
+    
+    # Cached is_genshin_focused() result and when it was taken (monotonic)
+    _focus_checked_at: float = float('-inf')
+    _focus_cached: bool = False
     
     def __init__(self):
         """Initialize the key sender."""
         self._enabled = True
+        self._closed = False  # Set by close(); no keys are accepted afterwards
         self._lock = threading.Lock()
+        # Long-lived `xdotool -` child reading commands from stdin (started lazily)
+        self._proc: Optional[subprocess.Popen] = None
+        
+        # In-process libxdo handle; None means use the xdotool child instead
+        self._xdo_lib = _load_libxdo()
+        self._xdo = None
+        self._xdo_send = None
+        if self._xdo_lib is not None:
+            self._xdo = self._xdo_lib.xdo_new(None)
+            if self._xdo:
+                self._xdo_send = self._xdo_lib.xdo_send_keysequence_window
+        
+        # Callers only enqueue; a dedicated thread performs the actual sends
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._drain, daemon=True)
+        self._worker.start()
+    
+    def _drain(self) -> None:
+        """Sender thread: deliver queued keys in order until told to stop."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if isinstance(item, threading.Event):
+                # flush() marker: everything queued before it has been sent
+                item.set()
+                continue
+            try:
+                self._deliver(item)
+            except Exception as e:
+                # Keep the sender thread alive so later keys still go out
+                print(f"Error sending key: {e}")
+    
+    def _ensure_process(self) -> subprocess.Popen:
+        """Start the xdotool child if it isn't running (or has crashed)."""
+        if self._proc is None or self._proc.poll() is not None:
+            xdotool = _find_xdotool()
+            if xdotool is None:
+                raise FileNotFoundError('xdotool')
+            self._proc = subprocess.Popen(
+                [xdotool, '-'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                bufsize=0
+            )
+        return self._proc
+    
+    def _write_command(self, command: str) -> bool:
+        """Write a single command line to the xdotool child."""
+        data = f"{command}\n".encode()
+        with self._lock:
+            try:
+                self._ensure_process().stdin.write(data)
+                return True
+            except BrokenPipeError:
+                # Child died between poll() and write(); restart once and retry
+                self._proc = None
+                self._ensure_process().stdin.write(data)
+                return True
+    
+    def _xdo_send_key(self, key: str) -> bool:
+        """Send a key press through libxdo with held modifiers released."""
+        lib = self._xdo_lib
+        mods = ctypes.c_void_p()
+        count = ctypes.c_int(0)
+        lib.xdo_get_active_modifiers(self._xdo, ctypes.byref(mods), ctypes.byref(count))
+        try:
+            # Like --clearmodifiers: a held Shift/Ctrl must not turn 'a' into 'A' or a shortcut
+            if count.value:
+                lib.xdo_clear_active_modifiers(self._xdo, XDO_CURRENT_WINDOW, mods, count)
+            sent = self._xdo_send(
+                self._xdo, XDO_CURRENT_WINDOW, key.encode(), XDO_KEY_DELAY_US
+            ) == 0
+            if count.value:
+                lib.xdo_set_active_modifiers(self._xdo, XDO_CURRENT_WINDOW, mods, count)
+        finally:
+            lib.libc_free(mods)
+        return sent
+    
+    def _deliver(self, key: str) -> bool:
+        """Send a key press right away, on the calling thread."""
+        if self._xdo_send is not None:
+            try:
+                with self._lock:
+                    return self._xdo_send_key(key)
+            except (OSError, ctypes.ArgumentError) as e:
+                # Stop using libxdo for the rest of the session; xdotool takes over
+                print(f"Error sending key through libxdo, using xdotool instead: {e}")
+                self._xdo_send = None
+        
+        try:
+            return self._write_command(f"key --clearmodifiers {key}")
+        except FileNotFoundError:
+            print("Error: xdotool not found. Please install it: sudo apt install xdotool")
+            return False
+        except Exception as e:
+            print(f"Error sending key: {e}")
+            return False
+    
+    def prepare(self) -> None:
+        """Start the xdotool child now so the first key doesn't pay for the spawn."""
+        if self._xdo_send is not None:
+            return
+        with self._lock:
+            try:
+                self._ensure_process()
+            except OSError:
+                pass  # Reported by the first send
     
     def send_key(self, key: str) -> bool:
         """
-        Send a key press using xdotool.
+        Queue a key press for the sender thread.
         
         Args:
             key: Key to send (e.g., 'a', 'q', 'z')
             
         Returns:
-            True if key was sent successfully
+            True if the key was queued
         """
-        if not self._enabled or not key:
+        if self._closed or not self._enabled or not key:
             return False
         
-        try:
-            subprocess.Popen(
-                ['xdotool', 'key', '--clearmodifiers', key],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
-            )
-            return True
-        except FileNotFoundError:
-            print("Error: xdotool not found. Please install it: sudo apt install xdotool")
-            return False
-        except Exception as e:
-            print(f"Error sending key: {e}")
-            return False
+        self._queue.put_nowait(key)
+        return True
     
     def send_keys(self, keys: list) -> bool:
         """
@@ -51,15 +222,69 @@ class KeySender:
             keys: List of keys to send together
             
         Returns:
-            True if keys were sent successfully
+            True if keys were queued
         """
         if not self._enabled or not keys:
             return False
         
-        # For chords, send all keys at once
+        # For chords, send all keys at once as a single command line
         key_str = '+'.join(keys)
         return self.send_key(key_str)
     
+    def flush(self, timeout: float = 1.0) -> bool:
+        """
+        Wait until every key queued so far has been sent.
+        
+        Returns:
+            True if the queue drained within the timeout
+        """
+        if not self._worker.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put_nowait(done)
+        return done.wait(timeout)
+    
+    def clear(self) -> None:
+        """Drop keys that are queued but not yet sent (e.g. when playback stops)."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, threading.Event):
+                item.set()  # Release a flush() waiter; its keys are gone
+            elif item is None:
+                self._queue.put_nowait(None)  # Keep the worker's stop marker
+                return
+    
+    def close(self) -> None:
+        """Stop the sender thread, release libxdo and terminate the xdotool child."""
+        self._closed = True
+        self.clear()
+        if self._worker.is_alive():
+            self._queue.put_nowait(None)
+            self._worker.join(timeout=1.0)
+        
+        with self._lock:
+            proc, self._proc = self._proc, None
+            if self._xdo:
+                self._xdo_lib.xdo_free(self._xdo)
+                self._xdo = None
+                self._xdo_send = None
+        
+        if proc is None:
+            return
+        
+        try:
+            proc.stdin.close()
+        except Exception:
+            pass
+        
+        try:
+            proc.wait(timeout=0.5)
+        except subprocess.TimeoutExpired:
+            proc.terminate()
+    
     def enable(self) -> None:
         """Enable key sending."""
         self._enabled = True
@@ -76,22 +301,18 @@ class KeySender:
     @staticmethod
     def check_xdotool() -> bool:
         """Check if xdotool is available on the system."""
-        try:
-            result = subprocess.run(
-                ['which', 'xdotool'],
-                capture_output=True,
-                text=True
-            )
-            return result.returncode == 0
-        except Exception:
-            return False
+        return _find_xdotool() is not None
     
     @staticmethod
     def get_active_window() -> Optional[str]:
         """Get the name of the currently active window."""
+        xdotool = _find_xdotool()
+        if xdotool is None:
+            return None
+        
         try:
             result = subprocess.run(
-                ['xdotool', 'getactivewindow', 'getwindowname'],
+                [xdotool, 'getactivewindow', 'getwindowname'],
                 capture_output=True,
                 text=True
             )
@@ -103,10 +324,17 @@ class KeySender:
     
     @staticmethod
     def is_genshin_focused() -> bool:
-        """Check if Genshin Impact is the active window."""
+        """Check if Genshin Impact is the active window (cached for a short TTL)."""
+        now = time.monotonic()
+        if now - KeySender._focus_checked_at < FOCUS_CACHE_TTL_S:
+            return KeySender._focus_cached
+        
         window_name = KeySender.get_active_window()
+        focused = False
         if window_name:
-            # Common window titles for Genshin Impact
-            genshin_titles = ['genshin impact', 'genshin', '原神']
-            return any(title in window_name.lower() for title in genshin_titles)
-        return False
+            lowered = window_name.lower()
+            focused = any(title in lowered for title in GENSHIN_TITLES)
+        
+        KeySender._focus_cached = focused
+        KeySender._focus_checked_at = now
+        return focused
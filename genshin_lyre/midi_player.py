@@ -3,21 +3,47 @@ MIDI Player module for Genshin Impact Lyre.
 Handles MIDI file parsing and playback with accurate timing.
 """
 
+import bisect
+import functools
+import heapq
+import itertools
+import operator
 import threading
 import time
+from array import array
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 import mido
 
 from .key_mapper import KeyMapper
 from .key_sender import KeySender
 
+# Default MIDI tempo in microseconds per beat (120 BPM)
+DEFAULT_TEMPO = 500000
 
-@dataclass
+# Notes starting less than this many ms apart are sent as one chord keystroke
+CHORD_FUSE_MS = 2.0
+
+# Longest the playback loop sleeps, so the position keeps advancing during rests
+MAX_IDLE_WAIT_S = 0.05
+
+# Minimum interval between on_position_changed calls (~30 per second)
+POSITION_EMIT_INTERVAL_S = 0.033
+
+
+@functools.lru_cache(maxsize=8192)
+def _format_seconds(total_seconds: int) -> str:
+    """Format whole seconds as MM:SS (cached; shared by all players)."""
+    minutes = total_seconds // 60
+    seconds = total_seconds % 60
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+@dataclass(slots=True)
 class MidiNote:
-    """Represents a single MIDI note event."""
+    """Represents a single MIDI note event (built on demand from note columns)."""
     time_ms: float  # Time in milliseconds from start
     note: int       # MIDI note number
     velocity: int   # Note velocity
@@ -25,14 +51,22 @@ class MidiNote:
     track_index: int = 0  # Which track this note belongs to
 
 
-@dataclass
+@dataclass(slots=True)
 class MidiTrack:
-    """Represents a MIDI track."""
+    """Represents a MIDI track with its notes stored as parallel columns."""
     index: int
     name: str
-    notes: List[MidiNote] = field(default_factory=list)
+    times: array = field(default_factory=lambda: array('d'))       # Start times (ms)
+    pitches: array = field(default_factory=lambda: array('B'))     # MIDI note numbers
+    velocities: array = field(default_factory=lambda: array('B'))  # Note velocities
+    durations: array = field(default_factory=lambda: array('d'))   # Durations (ms)
     enabled: bool = True
     instrument: str = ""
+    
+    @property
+    def note_count(self) -> int:
+        """Number of notes in this track."""
+        return len(self.times)
 
 
 class MidiPlayer:
@@ -53,14 +87,26 @@ class MidiPlayer:
         self.midi_file: Optional[mido.MidiFile] = None
         self.file_path: str = ""
         self.tracks: List[MidiTrack] = []
-        self.all_notes: List[MidiNote] = []
         self.duration_ms: float = 0
         
+        # Notes of all enabled tracks in time order, as parallel columns
+        self._note_times = array('d')
+        self._note_pitches = array('B')
+        self._note_velocities = array('B')
+        self._note_durations = array('d')
+        self._note_tracks = array('H')
+        
+        # Playback script: (times, keychords, event note indices, note columns),
+        # one entry per chord event (fused simultaneous notes). Rebuilds replace
+        # the whole tuple, so the playback thread never mixes two builds
+        self._script: Tuple[tuple, tuple, tuple, tuple] = ((), (), (), ())
+        
         # Playback state
         self._playing = False
         self._paused = False
         self._stop_flag = False
         self._seek_requested = False  # Flag to signal the playback loop to update position
+        self._wake = threading.Event()  # Interrupts the playback loop's sleep
         self._current_position_ms: float = 0
         self._playback_thread: Optional[threading.Thread] = None
         self._speed: float = 1.0
@@ -73,6 +119,9 @@ class MidiPlayer:
         self.on_playback_finished: Optional[Callable[[], None]] = None
         self.on_playback_started: Optional[Callable[[], None]] = None
         self.on_playback_stopped: Optional[Callable[[], None]] = None
+        
+        # Re-resolve keys when the layout or transposition changes
+        self.key_mapper.on_mapping_changed = self._build_playback_script
     
     def load_file(self, file_path: str) -> bool:
         """
@@ -95,114 +144,218 @@ class MidiPlayer:
             print(f"Error loading MIDI file: {e}")
             return False
     
+    def _build_tempo_map(self) -> Tuple[List[int], List[float], List[float]]:
+        """
+        Collect tempo changes from all tracks into piecewise tempo segments.
+        
+        Returns:
+            Parallel lists of segment start tick, segment start time in ms,
+            and milliseconds per tick within the segment
+        """
+        ticks_per_beat = self.midi_file.ticks_per_beat
+        
+        # Absolute tick -> tempo; tempo events normally live in track 0
+        tempo_changes: Dict[int, int] = {0: DEFAULT_TEMPO}
+        for track in self.midi_file.tracks:
+            tick = 0
+            for msg in track:
+                tick += msg.time
+                if msg.type == 'set_tempo':
+                    tempo_changes[tick] = msg.tempo
+        
+        seg_ticks: List[int] = []
+        seg_ms: List[float] = []
+        seg_ms_per_tick: List[float] = []
+        elapsed_ms = 0.0
+        prev_tick = 0
+        prev_ms_per_tick = 0.0
+        
+        for tick in sorted(tempo_changes):
+            elapsed_ms += (tick - prev_tick) * prev_ms_per_tick
+            prev_tick = tick
+            prev_ms_per_tick = tempo_changes[tick] / ticks_per_beat / 1000.0
+            seg_ticks.append(tick)
+            seg_ms.append(elapsed_ms)
+            seg_ms_per_tick.append(prev_ms_per_tick)
+        
+        return seg_ticks, seg_ms, seg_ms_per_tick
+    
     def _parse_tracks(self) -> None:
         """Parse tracks and notes from the loaded MIDI file."""
         if not self.midi_file:
             return
         
         self.tracks = []
-        self.all_notes = []
         
-        ticks_per_beat = self.midi_file.ticks_per_beat
-        tempo = 500000  # Default tempo (120 BPM)
+        seg_ticks, seg_ms, seg_ms_per_tick = self._build_tempo_map()
         
         for track_idx, track in enumerate(self.midi_file.tracks):
             track_name = f"Track {track_idx + 1}"
             instrument = ""
+            notes: List[tuple] = []  # (start_time_ms, note, velocity, duration_ms)
+            active_notes: Dict[int, tuple] = {}  # note -> (start_time_ms, velocity)
+            
+            # Walk the tempo segments alongside the track; ticks only increase
+            seg = 0
+            seg_start_tick = 0
+            seg_start_ms = 0.0
+            ms_per_tick = seg_ms_per_tick[0]
+            next_change = seg_ticks[1] if len(seg_ticks) > 1 else None
+            tick = 0
+            current_time_ms = 0.0
             
-            # Find track name and instrument
             for msg in track:
-                if msg.type == 'track_name':
+                if msg.time:
+                    tick += msg.time
+                    while next_change is not None and tick >= next_change:
+                        seg += 1
+                        seg_start_tick = seg_ticks[seg]
+                        seg_start_ms = seg_ms[seg]
+                        ms_per_tick = seg_ms_per_tick[seg]
+                        next_change = seg_ticks[seg + 1] if seg + 1 < len(seg_ticks) else None
+                    current_time_ms = seg_start_ms + (tick - seg_start_tick) * ms_per_tick
+                
+                msg_type = msg.type
+                
+                if msg_type == 'note_on' or msg_type == 'note_off':
+                    if msg_type == 'note_on' and msg.velocity > 0:
+                        active_notes[msg.note] = (current_time_ms, msg.velocity)
+                    elif msg.note in active_notes:
+                        start_time, velocity = active_notes.pop(msg.note)
+                        notes.append(
+                            (start_time, msg.note, velocity, current_time_ms - start_time)
+                        )
+                elif msg_type == 'track_name':
                     track_name = msg.name
-                elif msg.type == 'program_change':
+                elif msg_type == 'program_change':
                     instrument = f"Program {msg.program}"
             
+            # Notes are completed in note-off order; sort once by start time
+            notes.sort(key=operator.itemgetter(0))
+            
             midi_track = MidiTrack(
                 index=track_idx,
                 name=track_name,
                 instrument=instrument
             )
-            
-            # Parse notes
-            current_time_ticks = 0
-            active_notes: Dict[int, tuple] = {}  # note -> (start_time_ms, velocity)
-            
-            for msg in track:
-                current_time_ticks += msg.time
-                
-                # Update tempo if tempo change message
-                if msg.type == 'set_tempo':
-                    tempo = msg.tempo
-                
-                current_time_ms = mido.tick2second(
-                    current_time_ticks, ticks_per_beat, tempo
-                ) * 1000
-                
-                if msg.type == 'note_on' and msg.velocity > 0:
-                    active_notes[msg.note] = (current_time_ms, msg.velocity)
-                elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                    if msg.note in active_notes:
-                        start_time, velocity = active_notes.pop(msg.note)
-                        note = MidiNote(
-                            time_ms=start_time,
-                            note=msg.note,
-                            velocity=velocity,
-                            duration_ms=current_time_ms - start_time,
-                            track_index=track_idx
-                        )
-                        midi_track.notes.append(note)
+            if notes:
+                times, pitches, velocities, durations = zip(*notes)
+                midi_track.times = array('d', times)
+                midi_track.pitches = array('B', pitches)
+                midi_track.velocities = array('B', velocities)
+                midi_track.durations = array('d', durations)
             
             self.tracks.append(midi_track)
         
         # Calculate total duration
         self.duration_ms = self.midi_file.length * 1000
         
-        # Build sorted list of all notes
+        # Build sorted note columns for all enabled tracks
         self._rebuild_all_notes()
     
     def _rebuild_all_notes(self) -> None:
-        """Rebuild the all_notes list based on enabled tracks."""
-        self.all_notes = []
-        enabled_tracks: Set[int] = {t.index for t in self.tracks if t.enabled}
-        
-        for track in self.tracks:
-            if track.enabled:
-                self.all_notes.extend(track.notes)
+        """Rebuild the merged note columns based on enabled tracks."""
+        # Each track is already sorted, so a K-way merge keeps time order
+        merged = list(heapq.merge(
+            *(zip(t.times, t.pitches, t.velocities, t.durations, itertools.repeat(t.index))
+              for t in self.tracks if t.enabled),
+            key=operator.itemgetter(0)
+        ))
+        times, pitches, velocities, durations, tracks = zip(*merged) if merged else ((),) * 5
         
-        # Sort by time
-        self.all_notes.sort(key=lambda n: n.time_ms)
+        self._note_times = array('d', times)
+        self._note_pitches = array('B', pitches)
+        self._note_velocities = array('B', velocities)
+        self._note_durations = array('d', durations)
+        self._note_tracks = array('H', tracks)
         
         # Merge nearby notes if enabled
         if self._merge_enabled and self._merge_threshold_ms > 0:
             self._merge_nearby_notes()
+        
+        self._build_playback_script()
+    
+    @staticmethod
+    def _note_at(columns: tuple, index: int) -> MidiNote:
+        """Build a MidiNote view of one entry in a script's note columns."""
+        times, pitches, velocities, durations, tracks = columns
+        return MidiNote(
+            time_ms=times[index],
+            note=pitches[index],
+            velocity=velocities[index],
+            duration_ms=durations[index],
+            track_index=tracks[index]
+        )
+    
+    def _build_playback_script(self) -> None:
+        """
+        Precompute chord events so playback does no mapping work.
+        
+        Consecutive notes less than CHORD_FUSE_MS apart are fused into one
+        event whose key string is the '+'-joined chord of their keys.
+        """
+        get_key = self.key_mapper.get_key
+        times: List[float] = []
+        keychords: List[str] = []
+        event_notes: List[List[int]] = []
+        
+        group_time = 0.0
+        group_keys: Set[str] = set()
+        group_notes: List[int] = []
+        prev_time = None
+        
+        for index, (time_ms, pitch) in enumerate(zip(self._note_times, self._note_pitches)):
+            if prev_time is None or time_ms - prev_time >= CHORD_FUSE_MS:
+                # A group of only unmapped notes sends nothing, so it gets no event
+                if group_notes:
+                    times.append(group_time)
+                    keychords.append('+'.join(sorted(group_keys)))
+                    event_notes.append(group_notes)
+                group_time = time_ms
+                group_keys = set()
+                group_notes = []
+            
+            key = get_key(pitch, clamp=True)
+            if key:
+                group_keys.add(key)
+                group_notes.append(index)
+            prev_time = time_ms
+        
+        # Close the last group
+        if group_notes:
+            times.append(group_time)
+            keychords.append('+'.join(sorted(group_keys)))
+            event_notes.append(group_notes)
+        
+        # Keep the columns the note indices refer to; a rebuild replaces them
+        columns = (self._note_times, self._note_pitches, self._note_velocities,
+                   self._note_durations, self._note_tracks)
+        self._script = (tuple(times), tuple(keychords), tuple(event_notes), columns)
     
     def _merge_nearby_notes(self) -> None:
         """Merge notes that are close together in time."""
-        if not self.all_notes:
+        times = self._note_times
+        if not times:
             return
         
-        merged = []
-        current_group: List[MidiNote] = [self.all_notes[0]]
-        
-        for note in self.all_notes[1:]:
-            if note.time_ms - current_group[0].time_ms <= self._merge_threshold_ms:
-                current_group.append(note)
-            else:
-                # Average the time of the group
-                avg_time = sum(n.time_ms for n in current_group) / len(current_group)
-                for n in current_group:
-                    n.time_ms = avg_time
-                merged.extend(current_group)
-                current_group = [note]
-        
-        # Don't forget the last group
-        if current_group:
-            avg_time = sum(n.time_ms for n in current_group) / len(current_group)
-            for n in current_group:
-                n.time_ms = avg_time
-            merged.extend(current_group)
-        
-        self.all_notes = merged
+        # Group boundaries: a note opens a new group once it is more than the
+        # threshold after the first note of the current group
+        threshold = self._merge_threshold_ms
+        starts = [0]
+        anchor = times[0]
+        for index, time_ms in enumerate(times):
+            if time_ms - anchor > threshold:
+                starts.append(index)
+                anchor = time_ms
+        ends = starts[1:] + [len(times)]
+        
+        # Every note in a group gets the group's average time
+        merged = array('d')
+        for start, end in zip(starts, ends):
+            count = end - start
+            merged.extend(itertools.repeat(sum(times[start:end]) / count, count))
+        
+        self._note_times = merged
     
     def set_track_enabled(self, track_index: int, enabled: bool) -> None:
         """Enable or disable a track."""
@@ -227,9 +380,10 @@ class MidiPlayer:
         if self._playing:
             if self._paused:
                 self._paused = False
+                self._wake.set()
             return
         
-        if not self.all_notes:
+        if not self._script[0]:
             return
         
         self._playing = True
@@ -247,21 +401,26 @@ class MidiPlayer:
         """Pause playback."""
         if self._playing and not self._paused:
             self._paused = True
+            self._wake.set()
     
     def resume(self) -> None:
         """Resume playback."""
         if self._playing and self._paused:
             self._paused = False
+            self._wake.set()
     
     def stop(self) -> None:
         """Stop playback."""
         self._stop_flag = True
         self._playing = False
         self._paused = False
+        self._wake.set()
         
         if self._playback_thread and self._playback_thread.is_alive():
             self._playback_thread.join(timeout=1.0)
         
+        # Keys queued before Stop must not fire after it
+        self.key_sender.clear()
         self._current_position_ms = 0
         
         if self.on_playback_stopped:
@@ -271,61 +430,90 @@ class MidiPlayer:
         """Seek to a position in milliseconds."""
         self._current_position_ms = max(0, min(position_ms, self.duration_ms))
         self._seek_requested = True  # Signal the playback loop to update
+        self._wake.set()
+    
+    @staticmethod
+    def _event_index_at(times: tuple, position_ms: float) -> int:
+        """Index of the first event in a script's times at or after position_ms."""
+        return bisect.bisect_left(times, position_ms)
     
     def _playback_loop(self) -> None:
         """Main playback loop running in a thread."""
-        start_time = time.perf_counter()
+        # Bind hot lookups to locals once; they don't change during playback
+        perf_counter = time.perf_counter
+        wake = self._wake
+        send_key = self.key_sender.send_key
+        note_at = self._note_at
+        on_position_changed = self.on_position_changed
+        on_note_played = self.on_note_played
+        
+        start_time = perf_counter()
         start_position = self._current_position_ms
-        note_index = 0
+        last_position_emit = 0.0
         
-        # Find the starting note index
-        while note_index < len(self.all_notes) and \
-              self.all_notes[note_index].time_ms < start_position:
-            note_index += 1
+        # Find the starting event index
+        script = self._script
+        times, keychords, event_notes, columns = script
+        event_index = self._event_index_at(times, start_position)
         
-        while not self._stop_flag and note_index < len(self.all_notes):
+        while not self._stop_flag:
+            # The script is rebuilt on track, layout, transpose and merge changes;
+            # pick up a new one whole and find our place in it
+            if self._script is not script:
+                script = self._script
+                times, keychords, event_notes, columns = script
+                event_index = self._event_index_at(times, self._current_position_ms)
+            event_count = len(times)
+            if event_index >= event_count:
+                break
+            
+            # Clear before checking state so a control call made from here on
+            # still interrupts the next wait
+            wake.clear()
+            
             if self._paused:
-                # While paused, update start time to maintain position
-                start_time = time.perf_counter()
+                # Block until resumed, then restart timing from the held position
+                wake.wait()
+                start_time = perf_counter()
                 start_position = self._current_position_ms
-                time.sleep(0.01)
                 continue
             
             # Check if seek was requested
             if self._seek_requested:
                 self._seek_requested = False
-                start_time = time.perf_counter()
+                start_time = perf_counter()
                 start_position = self._current_position_ms
-                # Re-find the note index for the new position
-                note_index = 0
-                while note_index < len(self.all_notes) and \
-                      self.all_notes[note_index].time_ms < start_position:
-                    note_index += 1
+                # Re-find the event index for the new position
+                event_index = self._event_index_at(times, start_position)
+                # Report the new position on the next pass
+                last_position_emit = 0.0
                 continue
             
             # Calculate current position
-            elapsed_ms = (time.perf_counter() - start_time) * 1000 * self._speed
-            self._current_position_ms = start_position + elapsed_ms
+            speed = self._speed
+            now = perf_counter()
+            position_ms = start_position + (now - start_time) * 1000 * speed
+            self._current_position_ms = position_ms
             
-            # Update position callback
-            if self.on_position_changed:
-                self.on_position_changed(self._current_position_ms)
+            # Update position callback, throttled to what a UI can display
+            if on_position_changed and now - last_position_emit >= POSITION_EMIT_INTERVAL_S:
+                last_position_emit = now
+                on_position_changed(position_ms)
             
-            # Play all notes that should have played by now
-            while note_index < len(self.all_notes) and \
-                  self.all_notes[note_index].time_ms <= self._current_position_ms:
-                note = self.all_notes[note_index]
-                key = self.key_mapper.get_key(note.note, clamp=True)
-                
-                if key:
-                    self.key_sender.send_key(key)
-                    if self.on_note_played:
-                        self.on_note_played(note)
+            # Play all events that should have played by now
+            while event_index < event_count and times[event_index] <= position_ms:
+                send_key(keychords[event_index])
+                if on_note_played:
+                    for note_index in event_notes[event_index]:
+                        on_note_played(note_at(columns, note_index))
                 
-                note_index += 1
+                event_index += 1
             
-            # Small sleep to prevent 100% CPU usage
-            time.sleep(0.001)
+            # Sleep until the next event is due; pause/stop/seek wake us early
+            if event_index < event_count:
+                delay = (times[event_index] - position_ms) / 1000.0 / speed
+                if delay > 0:
+                    wake.wait(min(delay, MAX_IDLE_WAIT_S))
         
         self._playing = False
         
@@ -359,7 +547,4 @@ class MidiPlayer:
     @staticmethod
     def format_time(ms: float) -> str:
         """Format milliseconds as MM:SS."""
-        total_seconds = int(ms / 1000)
-        minutes = total_seconds // 60
-        seconds = total_seconds % 60
-        return f"{minutes:02d}:{seconds:02d}"
+        return _format_seconds(int(ms / 1000))
@@ -3,10 +3,28 @@ Settings module for Genshin Lyre MIDI Player.
 Handles persistent settings storage using JSON.
 """
 
+import atexit
 import json
+import mmap
 import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from gi.repository import GLib
+except ImportError:  # Non-GTK contexts fall back to threading.Timer
+    GLib = None
+
+# Delay before pending changes are written to disk
+SAVE_DEBOUNCE_MS = 250
+
+# Number of recent files kept in history
+HISTORY_LIMIT = 20
+
+# Marks a key with no stored value when checking for changes
+_MISSING = object()
 
 
 class Settings:
@@ -47,43 +65,139 @@ class Settings:
             self.config_path = Path(config_path)
         
         self._settings: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        
+        # Ordered-set views of list settings (history, playlist), built on demand
+        self._ordered_cache: Dict[str, OrderedDict] = {}
+        
+        # Write-behind state: changes are flushed once per debounce window
+        self._dirty = False
+        self._dirty_serial = 0  # Bumped by every schedule_save()
+        self._flush_source_id: Optional[int] = None
+        self._flush_timer: Optional[threading.Timer] = None
+        
+        # File contents as last read or written, to skip no-op saves
+        self._last_saved_bytes = b''
+        
+        # Called with (key, value) after a setting's value actually changes
+        self.on_changed: Optional[Callable[[str, Any], None]] = None
+        
         self.load()
+        atexit.register(self.flush)
     
     def load(self) -> None:
         """Load settings from file."""
+        self._ordered_cache.clear()
+        self._last_saved_bytes = b''
         try:
             if self.config_path.exists():
-                with open(self.config_path, 'r') as f:
-                    loaded = json.load(f)
-                    # Merge with defaults to handle new settings
-                    self._settings = {**self.DEFAULT_SETTINGS, **loaded}
+                # Parse straight from the mapped bytes (mmap rejects empty
+                # files with ValueError, which falls back to defaults below)
+                with open(self.config_path, 'rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        raw = mm[:]
+                loaded = json.loads(raw)
+                self._last_saved_bytes = raw
+                # Merge with defaults to handle new settings
+                self._settings = {**self.DEFAULT_SETTINGS, **loaded}
             else:
                 self._settings = self.DEFAULT_SETTINGS.copy()
-        except (json.JSONDecodeError, IOError):
+        except (json.JSONDecodeError, ValueError, IOError):
             self._settings = self.DEFAULT_SETTINGS.copy()
     
     def save(self) -> None:
-        """Save settings to file."""
+        """Save settings to file immediately (atomically, via a temp file)."""
+        with self._lock:
+            data = json.dumps(self._settings, indent=2).encode('utf-8')
+            serial = self._dirty_serial
+            if data == self._last_saved_bytes:
+                self._dirty = False
+                return  # Nothing changed since the last write
+        
+        tmp_path = self.config_path.with_suffix('.tmp')
         try:
-            with open(self.config_path, 'w') as f:
-                json.dump(self._settings, f, indent=2)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_path)
         except IOError as e:
+            # Stay dirty so flush() or the atexit handler tries again
             print(f"Error saving settings: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        
+        with self._lock:
+            self._last_saved_bytes = data
+            # A change made during the write still needs its own save
+            if self._dirty_serial == serial:
+                self._dirty = False
+    
+    def schedule_save(self) -> None:
+        """Mark settings dirty and write them after SAVE_DEBOUNCE_MS."""
+        with self._lock:
+            self._dirty = True
+            self._dirty_serial += 1
+        if self._flush_source_id is not None or self._flush_timer is not None:
+            return
+        
+        if GLib is not None:
+            self._flush_source_id = GLib.timeout_add(SAVE_DEBOUNCE_MS, self._on_flush_timeout)
+        else:
+            self._flush_timer = threading.Timer(SAVE_DEBOUNCE_MS / 1000, self._on_flush_timeout)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+    
+    def _on_flush_timeout(self) -> bool:
+        """Debounce timer callback."""
+        self._flush_source_id = None
+        self._flush_timer = None
+        if self._dirty:
+            self.save()
+        return False  # Don't repeat
+    
+    def flush(self) -> None:
+        """Write any pending changes now."""
+        if self._flush_source_id is not None:
+            GLib.source_remove(self._flush_source_id)
+            self._flush_source_id = None
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        
+        if self._dirty:
+            self.save()
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get a setting value."""
         return self._settings.get(key, default)
     
     def set(self, key: str, value: Any, auto_save: bool = True) -> None:
-        """Set a setting value."""
-        self._settings[key] = value
+        """Set a setting value (saved after a short debounce if auto_save)."""
+        with self._lock:
+            changed = self._settings.get(key, _MISSING) != value
+            self._settings[key] = value
+            self._ordered_cache.pop(key, None)
         if auto_save:
-            self.save()
+            self.schedule_save()
+        if changed and self.on_changed:
+            self.on_changed(key, value)
     
     def reset(self) -> None:
         """Reset all settings to defaults."""
-        self._settings = self.DEFAULT_SETTINGS.copy()
-        self.save()
+        with self._lock:
+            old = self._settings
+            self._settings = self.DEFAULT_SETTINGS.copy()
+            self._ordered_cache.clear()
+            changed = [(key, value) for key, value in self._settings.items()
+                       if old.get(key, _MISSING) != value]
+        self.schedule_save()
+        if self.on_changed:
+            for key, value in changed:
+                self.on_changed(key, value)
     
     # Convenience properties for common settings
     @property
@@ -126,17 +240,34 @@ class Settings:
     def playback_speed(self, value: float):
         self.set('playback_speed', max(0.25, min(2.0, value)))
     
+    # Ordered list settings
+    def _ordered(self, key: str) -> OrderedDict:
+        """Get a list setting as an ordered set (cached until the key is set directly)."""
+        ordered = self._ordered_cache.get(key)
+        if ordered is None:
+            ordered = OrderedDict.fromkeys(self.get(key, []))
+            self._ordered_cache[key] = ordered
+        return ordered
+    
+    def _store_ordered(self, key: str, ordered: OrderedDict) -> None:
+        """Write an ordered set back as a JSON list, keeping the cached view."""
+        with self._lock:
+            value = self._settings[key] = list(ordered)
+        self.schedule_save()
+        if self.on_changed:
+            self.on_changed(key, value)
+    
     # History management
     def add_to_history(self, file_path: str) -> None:
         """Add a file to history."""
-        history = self.get('history', [])
-        # Remove if already exists (to move to front)
-        if file_path in history:
-            history.remove(file_path)
-        # Add to front
-        history.insert(0, file_path)
-        # Keep only last 20 items
-        self.set('history', history[:20])
+        history = self._ordered('history')
+        # Add or move to front
+        history[file_path] = None
+        history.move_to_end(file_path, last=False)
+        # Keep only the most recent items
+        while len(history) > HISTORY_LIMIT:
+            history.popitem(last=True)
+        self._store_ordered('history', history)
     
     def get_history(self) -> List[str]:
         """Get file history."""
@@ -157,14 +288,14 @@ class Settings:
     
     def add_to_playlist(self, file_path: str) -> None:
         """Add a file to the playlist."""
-        playlist = self.get_playlist()
+        playlist = self._ordered('playlist')
         if file_path not in playlist:
-            playlist.append(file_path)
-            self.set('playlist', playlist)
+            playlist[file_path] = None
+            self._store_ordered('playlist', playlist)
     
     def remove_from_playlist(self, file_path: str) -> None:
         """Remove a file from the playlist."""
-        playlist = self.get_playlist()
+        playlist = self._ordered('playlist')
         if file_path in playlist:
-            playlist.remove(file_path)
-            self.set('playlist', playlist)
+            del playlist[file_path]
+            self._store_ordered('playlist', playlist)
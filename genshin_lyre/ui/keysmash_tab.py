@@ -3,13 +3,17 @@ Auto Key Smash Tab for Genshin Lyre MIDI Player.
 Provides automated key spamming functionality.
 """
 
+import itertools
 import random
 import threading
 import time
 
 import gi
 gi.require_version('Gtk', '4.0')
-from gi.repository import Gtk, GLib
+from gi.repository import Gtk
+
+# Smash modes in mode-dropdown order
+SMASH_MODES = ('sequential', 'random', 'chord')
 
 
 class KeySmashTab(Gtk.Box):
@@ -23,9 +27,17 @@ class KeySmashTab(Gtk.Box):
         self.set_margin_start(16)
         self.set_margin_end(16)
         
-        self._running = False
+        # Set while idle; the worker waits on it between keys so stop is immediate
+        self._stop_event = threading.Event()
+        self._stop_event.set()
         self._thread = None
         self._selected_keys = set(range(21))  # All keys by default
+        self._suppress_save = False  # Set while toggling buttons in bulk
+        
+        # Run parameters, snapshotted on the UI thread by _start()
+        self._run_keys = ()
+        self._run_delay = 0.1
+        self._run_mode = 'random'
         
         self._build_ui()
         self._load_settings()
@@ -181,26 +193,38 @@ class KeySmashTab(Gtk.Box):
         self.speed_scale.set_value(speed)
         
         # Mode
-        modes = ['sequential', 'random', 'chord']
         mode = settings.get('keysmash_mode', 'random')
         try:
-            mode_idx = modes.index(mode)
+            mode_idx = SMASH_MODES.index(mode)
             self.mode_dropdown.set_selected(mode_idx)
         except ValueError:
             self.mode_dropdown.set_selected(1)
         
         # Selected keys
         selected = settings.get('keysmash_keys', list(range(21)))
-        self._selected_keys = set(selected)
-        for idx, btn in self.key_buttons:
-            btn.set_active(idx in self._selected_keys)
+        self._set_selection(selected, save=False)
     
     def _save_selected_keys(self):
         """Save selected keys to settings."""
         self.app.settings.set('keysmash_keys', list(self._selected_keys))
     
+    def _set_selection(self, indices, save=True):
+        """Select exactly the given key indices, saving once at the end."""
+        self._selected_keys = set(indices)
+        self._suppress_save = True
+        try:
+            for idx, btn in self.key_buttons:
+                btn.set_active(idx in self._selected_keys)
+        finally:
+            self._suppress_save = False
+        if save:
+            self._save_selected_keys()
+    
     def _on_key_toggled(self, button, key_index):
         """Handle key toggle."""
+        if self._suppress_save:
+            # Bulk update: _selected_keys is already set by the caller
+            return
         if button.get_active():
             self._selected_keys.add(key_index)
         else:
@@ -209,24 +233,15 @@ class KeySmashTab(Gtk.Box):
     
     def _on_select_all(self, button):
         """Select all keys."""
-        self._selected_keys = set(range(21))
-        for idx, btn in self.key_buttons:
-            btn.set_active(True)
-        self._save_selected_keys()
+        self._set_selection(range(21))
     
     def _on_select_none(self, button):
         """Deselect all keys."""
-        self._selected_keys = set()
-        for idx, btn in self.key_buttons:
-            btn.set_active(False)
-        self._save_selected_keys()
+        self._set_selection(())
     
     def _select_row(self, indices):
         """Select only keys in a specific row."""
-        self._selected_keys = set(indices)
-        for idx, btn in self.key_buttons:
-            btn.set_active(idx in indices)
-        self._save_selected_keys()
+        self._set_selection(indices)
     
     def _on_speed_changed(self, scale):
         """Handle speed change."""
@@ -235,42 +250,59 @@ class KeySmashTab(Gtk.Box):
     
     def _on_mode_changed(self, dropdown, param):
         """Handle mode change."""
-        modes = ['sequential', 'random', 'chord']
         selected = dropdown.get_selected()
-        if 0 <= selected < len(modes):
-            self.app.settings.set('keysmash_mode', modes[selected])
+        if 0 <= selected < len(SMASH_MODES):
+            self.app.settings.set('keysmash_mode', SMASH_MODES[selected])
     
     def _on_start_clicked(self, button):
         """Handle start/stop button click."""
-        if self._running:
+        if not self._stop_event.is_set():
             self._stop()
         else:
             self._start()
     
     def _start(self):
         """Start key smashing."""
-        if not self._selected_keys:
+        # Per-layout tuple cached by KeyMapper, so a layout change is picked up here
+        key_table = self.app.key_mapper.get_all_keys()
+        self._run_keys = tuple(
+            key_table[i] for i in sorted(self._selected_keys)
+            if i < len(key_table) and key_table[i]  # Filter out empty keys
+        )
+        if not self._run_keys:
             self.status_label.set_label("No keys selected!")
             return
         
-        self._running = True
+        # Snapshot widget state here; the worker thread must not touch GTK
+        self._run_delay = 1.0 / max(1, int(self.speed_scale.get_value()))
+        selected = self.mode_dropdown.get_selected()
+        self._run_mode = SMASH_MODES[selected] if selected < len(SMASH_MODES) else 'random'
+        
+        self._stop_event.clear()
         self.start_button.set_label("Stop Smashing")
         self.start_button.remove_css_class('suggested-action')
         self.start_button.add_css_class('destructive-action')
         self.status_label.set_label("Smashing keys...")
         
+        # Make sure the sender backend is up before the first tick
+        self.app.key_sender.prepare()
+        
         self._thread = threading.Thread(target=self._smash_loop)
         self._thread.daemon = True
         self._thread.start()
     
     def _stop(self):
         """Stop key smashing."""
-        self._running = False
+        self._stop_event.set()
         
+        # The worker wakes from its wait at once, so this join is short
         if self._thread and self._thread.is_alive():
-            self._thread.join(timeout=1.0)
+            self._thread.join()
+        self._thread = None
+        # Keys queued before Stop must not fire after it
+        self.app.key_sender.clear()
         
-        GLib.idle_add(self._update_ui_stopped)
+        self._update_ui_stopped()
     
     def _update_ui_stopped(self):
         """Update UI when stopped."""
@@ -281,39 +313,46 @@ class KeySmashTab(Gtk.Box):
     
     def _smash_loop(self):
         """Main key smashing loop."""
-        key_mapper = self.app.key_mapper
         key_sender = self.app.key_sender
+        send_key = key_sender.send_key
+        stop_event = self._stop_event
+        monotonic = time.monotonic
         
-        keys = [key_mapper.get_key_for_index(i) for i in sorted(self._selected_keys)]
-        keys = [k for k in keys if k]  # Filter out empty keys
+        keys = self._run_keys
+        delay = self._run_delay
+        mode = self._run_mode
         
-        if not keys:
-            GLib.idle_add(self._stop)
-            return
+        # Pick the per-tick action once instead of testing the mode every key
+        if mode == 'sequential':
+            next_key = itertools.cycle(keys).__next__
+            
+            def step():
+                send_key(next_key())
         
-        speed = int(self.speed_scale.get_value())
-        delay = 1.0 / speed if speed > 0 else 0.1
+        elif mode == 'chord':
+            # Send all keys at once as a single chord
+            chord = '+'.join(keys)
+            
+            def step():
+                send_key(chord)
         
-        modes = ['sequential', 'random', 'chord']
-        mode = modes[self.mode_dropdown.get_selected()]
+        else:
+            choice = random.Random().choice
+            
+            def step():
+                send_key(choice(keys))
         
-        key_index = 0
+        # Absolute deadlines on the monotonic clock keep the rate from drifting
+        next_t = monotonic() + delay
         
-        while self._running:
-            if mode == 'sequential':
-                key = keys[key_index]
-                key_sender.send_key(key)
-                key_index = (key_index + 1) % len(keys)
-            
-            elif mode == 'random':
-                key = random.choice(keys)
-                key_sender.send_key(key)
+        while not stop_event.is_set():
+            step()
             
-            elif mode == 'chord':
-                # Send all keys at once
-                for key in keys:
-                    key_sender.send_key(key)
-            
-            time.sleep(delay)
-        
-        GLib.idle_add(self._update_ui_stopped)
+            sleep_s = next_t - monotonic()
+            if sleep_s > 0:
+                if stop_event.wait(sleep_s):
+                    break
+            elif sleep_s < -delay:
+                # Fell more than a tick behind; resync instead of bursting
+                next_t = monotonic()
+            next_t += delay
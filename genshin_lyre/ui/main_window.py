@@ -61,6 +61,9 @@ class MainWindow(Gtk.ApplicationWindow):
         self.notebook = Gtk.Notebook()
         self.notebook.set_vexpand(True)
         
+        # Placeholder page -> (attribute, tab class) for tabs built on first view
+        self._lazy_pages = {}
+        
         # Player tab
         self.player_tab = PlayerTab(self.app)
         player_label = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
@@ -70,23 +73,28 @@ class MainWindow(Gtk.ApplicationWindow):
         player_label.append(player_text)
         self.notebook.append_page(self.player_tab, player_label)
         
-        # Settings tab
-        self.settings_tab = SettingsTab(self.app)
+        # Settings tab (built on first view)
+        self.settings_tab = None
+        settings_page = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self._lazy_pages[settings_page] = ('settings_tab', SettingsTab)
         settings_label = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
         settings_icon = Gtk.Image.new_from_icon_name('preferences-system-symbolic')
         settings_text = Gtk.Label(label='Settings')
         settings_label.append(settings_icon)
         settings_label.append(settings_text)
-        self.notebook.append_page(self.settings_tab, settings_label)
+        self.notebook.append_page(settings_page, settings_label)
         
-        # Key Smash tab
-        self.keysmash_tab = KeySmashTab(self.app)
+        # Key Smash tab (built on first view)
+        self.keysmash_tab = None
+        keysmash_page = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self._lazy_pages[keysmash_page] = ('keysmash_tab', KeySmashTab)
         keysmash_label = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
         keysmash_icon = Gtk.Image.new_from_icon_name('input-keyboard-symbolic')
         keysmash_text = Gtk.Label(label='Auto Key Smash')
         keysmash_label.append(keysmash_icon)
         keysmash_label.append(keysmash_text)
-        self.notebook.append_page(self.keysmash_tab, keysmash_label)
+        self.notebook.append_page(keysmash_page, keysmash_label)
+        self.notebook.connect('switch-page', self._on_switch_page)
         
         main_box.append(self.notebook)
         
@@ -108,6 +116,18 @@ class MainWindow(Gtk.ApplicationWindow):
         
         main_box.append(self.status_bar)
     
+    def _on_switch_page(self, notebook, page, page_num):
+        """Build a lazily created tab the first time its page is selected."""
+        lazy = self._lazy_pages.pop(page, None)
+        if lazy is None:
+            return
+        
+        # Fill the placeholder rather than swapping pages mid-switch
+        attr, tab_class = lazy
+        tab = tab_class(self.app)
+        setattr(self, attr, tab)
+        page.append(tab)
+    
     def _connect_signals(self):
         """Connect window signals."""
         self.connect('close-request', self._on_close)
@@ -215,6 +235,7 @@ class MainWindow(Gtk.ApplicationWindow):
         height = self.get_height()
         self.app.settings.set('window_width', width, auto_save=False)
         self.app.settings.set('window_height', height)
+        self.app.settings.flush()
         
         # Stop any playback
         self.app.midi_player.stop()
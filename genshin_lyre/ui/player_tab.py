@@ -3,9 +3,41 @@ Player Tab for Genshin Lyre MIDI Player.
 Contains MIDI file controls, track list, and media controls.
 """
 
+import threading
+
 import gi
 gi.require_version('Gtk', '4.0')
-from gi.repository import Gtk, GLib, Pango
+from gi.repository import Gtk, Gio, GLib, GObject, Pango
+
+# Notes viewer rows, top to bottom: (MIDI note, note name, key) per key (from key_mapper.py)
+_KEYBOARD_LAYOUT = (
+    # Upper octave (C5-B5) - top row
+    ((72, 'C5', 'Q'), (74, 'D5', 'W'), (76, 'E5', 'E'), (77, 'F5', 'R'),
+     (79, 'G5', 'T'), (81, 'A5', 'Y'), (83, 'B5', 'U')),
+    # Middle octave (C4-B4) - middle row
+    ((60, 'C4', 'A'), (62, 'D4', 'S'), (64, 'E4', 'D'), (65, 'F4', 'F'),
+     (67, 'G4', 'G'), (69, 'A4', 'H'), (71, 'B4', 'J')),
+    # Lower octave (C3-B3) - bottom row
+    ((48, 'C3', 'Z'), (50, 'D3', 'X'), (52, 'E3', 'C'), (53, 'F3', 'V'),
+     (55, 'G3', 'B'), (57, 'A3', 'N'), (59, 'B3', 'M')),
+)
+
+# Same rows with each key's label markup formatted once at import
+_KEYBOARD_ROWS = tuple(
+    tuple((midi_note, f"<b>{note_name}</b>\n<small>{key_char}</small>")
+          for midi_note, note_name, key_char in row)
+    for row in _KEYBOARD_LAYOUT
+)
+
+
+class TrackItem(GObject.Object):
+    """List model item describing one MIDI track."""
+    __gtype_name__ = 'LyreTrackItem'
+    
+    index = GObject.Property(type=int, default=0)
+    name = GObject.Property(type=str, default='')
+    enabled = GObject.Property(type=bool, default=True)
+    note_count = GObject.Property(type=int, default=0)
 
 
 class PlayerTab(Gtk.Box):
@@ -19,8 +51,25 @@ class PlayerTab(Gtk.Box):
         self.set_margin_start(16)
         self.set_margin_end(16)
         
+        # Position updates are coalesced into one idle draw
+        self._last_time_str = None
+        self._formatted_sec = (-1, '')  # (whole second, text) last formatted
+        self._shown_duration_ms = None
+        self._last_slider_value = -1  # Whole percent last written to the slider
+        self._pending_position = None
+        self._idle_draw_id = None
+        
+        # Notes played since the last highlight flush (filled from the playback thread)
+        self._pending_lock = threading.Lock()
+        self._pending_notes = set()
+        self._highlight_flush_id = None
+        
+        # Latest flush serial per lit button, so an older batch's timer
+        # doesn't clear a key that was re-triggered since
+        self._highlight_serial = 0
+        self._lit_serial = {}
+        
         self._build_ui()
-        self._update_timer_id = None
     
     def _build_ui(self):
         """Build the player UI."""
@@ -42,18 +91,33 @@ class PlayerTab(Gtk.Box):
         scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         scrolled.set_min_content_height(150)
         
-        self.track_list = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        # Rows are recycled by the list view, so only visible tracks get widgets
+        self.track_store = Gio.ListStore.new(TrackItem)
+        # (index, name, enabled, note_count) per row, as last shown
+        self._last_tracks_snapshot = []
+        
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self._on_track_row_setup)
+        factory.connect('bind', self._on_track_row_bind)
+        
+        self.track_list = Gtk.ListView.new(Gtk.NoSelection.new(self.track_store), factory)
         self.track_list.set_margin_top(8)
         self.track_list.set_margin_bottom(8)
         self.track_list.set_margin_start(8)
         self.track_list.set_margin_end(8)
+        scrolled.set_child(self.track_list)
+        
+        track_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         
         self.no_tracks_label = Gtk.Label(label="Load a MIDI file to see tracks")
         self.no_tracks_label.add_css_class('dim-label')
-        self.track_list.append(self.no_tracks_label)
+        self.no_tracks_label.set_margin_top(8)
+        self.no_tracks_label.set_margin_bottom(8)
+        track_box.append(self.no_tracks_label)
         
-        scrolled.set_child(self.track_list)
-        track_frame.set_child(scrolled)
+        scrolled.set_vexpand(True)
+        track_box.append(scrolled)
+        track_frame.set_child(track_box)
         self.append(track_frame)
         
         # Notes Viewer (Keyboard Visualization) section
@@ -69,56 +133,38 @@ class PlayerTab(Gtk.Box):
         # Store key buttons for highlighting
         self.key_buttons = {}
         
-        # Note names and keys for each row (from key_mapper.py)
-        rows_data = [
-            # Upper octave (C5-B5) - top row
-            [('C5', 'Q'), ('D5', 'W'), ('E5', 'E'), ('F5', 'R'), ('G5', 'T'), ('A5', 'Y'), ('B5', 'U')],
-            # Middle octave (C4-B4) - middle row  
-            [('C4', 'A'), ('D4', 'S'), ('E4', 'D'), ('F4', 'F'), ('G4', 'G'), ('A4', 'H'), ('B4', 'J')],
-            # Lower octave (C3-B3) - bottom row
-            [('C3', 'Z'), ('D3', 'X'), ('E3', 'C'), ('F3', 'V'), ('G3', 'B'), ('A3', 'N'), ('B3', 'M')],
-        ]
-        
-        # MIDI note numbers for each position (for tracking)
-        midi_notes = [
-            [72, 74, 76, 77, 79, 81, 83],  # Upper octave
-            [60, 62, 64, 65, 67, 69, 71],  # Middle octave
-            [48, 50, 52, 53, 55, 57, 59],  # Lower octave
-        ]
+        keyboard_grid = Gtk.Grid(column_spacing=4, row_spacing=8)
+        keyboard_grid.set_halign(Gtk.Align.CENTER)
         
-        for row_idx, row_data in enumerate(rows_data):
-            row_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
-            row_box.set_halign(Gtk.Align.CENTER)
-            
-            for col_idx, (note_name, key_char) in enumerate(row_data):
-                midi_note = midi_notes[row_idx][col_idx]
-                
-                # Create a button for each key
+        for row_idx, row in enumerate(_KEYBOARD_ROWS):
+            for col_idx, (midi_note, markup) in enumerate(row):
+                # One button per key, labelled with the note name over the key
                 key_btn = Gtk.Button()
                 key_btn.set_size_request(50, 50)
+                key_btn.add_css_class('lyrekey')  # Highlighted via :checked
                 
-                # Create label with note name and key
-                label_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
-                label_box.set_valign(Gtk.Align.CENTER)
-                
-                note_label = Gtk.Label(label=note_name)
-                note_label.add_css_class('caption')
-                note_label.set_markup(f"<b>{note_name}</b>")
-                
-                key_label = Gtk.Label(label=key_char)
-                key_label.add_css_class('dim-label')
+                key_label = Gtk.Label()
                 key_label.add_css_class('caption')
-                
-                label_box.append(note_label)
-                label_box.append(key_label)
-                key_btn.set_child(label_box)
+                key_label.set_justify(Gtk.Justification.CENTER)
+                key_label.set_markup(markup)
+                key_btn.set_child(key_label)
                 
                 # Store reference for highlighting
                 self.key_buttons[midi_note] = key_btn
                 
-                row_box.append(key_btn)
-            
-            keyboard_container.append(row_box)
+                keyboard_grid.attach(key_btn, col_idx, row_idx, 1, 1)
+        
+        keyboard_container.append(keyboard_grid)
+        
+        # Button for every MIDI note, with out-of-range notes folded into the lyre's octaves
+        self._note_to_btn = [None] * 128
+        for midi_note in range(128):
+            clamped = midi_note
+            while clamped > 83:
+                clamped -= 12
+            while clamped < 48:
+                clamped += 12
+            self._note_to_btn[midi_note] = self.key_buttons.get(clamped)
         
         keyboard_frame.set_child(keyboard_container)
         self.append(keyboard_frame)
@@ -143,8 +189,9 @@ class PlayerTab(Gtk.Box):
         self.timeline_slider = Gtk.Scale.new_with_range(Gtk.Orientation.HORIZONTAL, 0, 100, 1)
         self.timeline_slider.set_draw_value(False)
         self.timeline_slider.set_hexpand(True)
-        self.timeline_slider.connect('value-changed', self._on_timeline_changed)
-        self._programmatic_update = False  # Flag to prevent feedback loop during programmatic updates
+        # Blocked while we move the slider ourselves to prevent a seek feedback loop
+        self._timeline_handler_id = self.timeline_slider.connect(
+            'value-changed', self._on_timeline_changed)
         timeline_box.append(self.timeline_slider)
         
         self.append(timeline_box)
@@ -210,44 +257,67 @@ class PlayerTab(Gtk.Box):
         
         self.append(controls_box)
     
+    def _on_track_row_setup(self, factory, list_item):
+        """Create the reusable widgets for a track row."""
+        track_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        
+        check = Gtk.CheckButton()
+        check.connect('toggled', self._on_track_toggled, list_item)
+        track_row.append(check)
+        
+        name_label = Gtk.Label()
+        name_label.set_hexpand(True)
+        name_label.set_xalign(0)
+        name_label.set_ellipsize(Pango.EllipsizeMode.END)
+        track_row.append(name_label)
+        
+        count_label = Gtk.Label()
+        count_label.add_css_class('dim-label')
+        track_row.append(count_label)
+        
+        list_item.set_child(track_row)
+    
+    def _on_track_row_bind(self, factory, list_item):
+        """Fill a recycled track row from its TrackItem."""
+        item = list_item.get_item()
+        check = list_item.get_child().get_first_child()
+        name_label = check.get_next_sibling()
+        count_label = name_label.get_next_sibling()
+        
+        check.set_active(item.enabled)
+        name_label.set_label(item.name)
+        count_label.set_label(f"({item.note_count} notes)")
+    
     def update_tracks(self):
         """Update the track list from the MIDI player."""
-        # Clear existing tracks
-        while True:
-            child = self.track_list.get_first_child()
-            if child:
-                self.track_list.remove(child)
-            else:
-                break
-        
         player = self.app.midi_player
         
-        if not player.tracks:
-            self.no_tracks_label = Gtk.Label(label="Load a MIDI file to see tracks")
-            self.no_tracks_label.add_css_class('dim-label')
-            self.track_list.append(self.no_tracks_label)
+        snapshot = [
+            (track.index, track.name, track.enabled, track.note_count)
+            for track in player.tracks
+        ]
+        old = self._last_tracks_snapshot
+        if snapshot == old:
             return
         
-        for track in player.tracks:
-            track_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
-            
-            check = Gtk.CheckButton()
-            check.set_active(track.enabled)
-            check.connect('toggled', self._on_track_toggled, track.index)
-            track_row.append(check)
-            
-            name_label = Gtk.Label(label=track.name)
-            name_label.set_hexpand(True)
-            name_label.set_xalign(0)
-            name_label.set_ellipsize(Pango.EllipsizeMode.END)
-            track_row.append(name_label)
-            
-            note_count = len(track.notes)
-            count_label = Gtk.Label(label=f"({note_count} notes)")
-            count_label.add_css_class('dim-label')
-            track_row.append(count_label)
-            
-            self.track_list.append(track_row)
+        # Replace only the rows that differ, then grow or shrink the tail
+        store = self.track_store
+        common = min(len(old), len(snapshot))
+        for pos in range(common):
+            if snapshot[pos] != old[pos]:
+                store.splice(pos, 1, [self._make_track_item(snapshot[pos])])
+        if len(old) != len(snapshot):
+            store.splice(common, len(old) - common,
+                         [self._make_track_item(row) for row in snapshot[common:]])
+        
+        self._last_tracks_snapshot = snapshot
+        self.no_tracks_label.set_visible(not snapshot)
+    
+    @staticmethod
+    def _make_track_item(row):
+        """Create a TrackItem from a snapshot row."""
+        index, name, enabled, note_count = row
+        return TrackItem(index=index, name=name, enabled=enabled, note_count=note_count)
     
     def update_file_info(self):
         """Update file information displays."""
@@ -256,36 +326,76 @@ class PlayerTab(Gtk.Box):
         file_name = player.get_file_name() or "No file loaded"
         self.now_playing_label.set_label(file_name)
         
-        self.total_time_label.set_label(player.format_time(player.duration_ms))
+        if player.duration_ms != self._shown_duration_ms:
+            self._shown_duration_ms = player.duration_ms
+            self.total_time_label.set_label(player.format_time(player.duration_ms))
         self._update_position(0)
     
+    def _format_position(self, position_ms):
+        """Format a position, reusing the text while the whole second is unchanged."""
+        sec = int(position_ms // 1000)
+        if sec != self._formatted_sec[0]:
+            self._formatted_sec = (sec, self.app.midi_player.format_time(sec * 1000))
+        return self._formatted_sec[1]
+    
     def _update_position(self, position_ms):
-        """Update position display."""
+        """Queue a position display update for the next idle pass."""
         player = self.app.midi_player
-        self.current_time_label.set_label(player.format_time(position_ms))
-        
+        progress = None
         if player.duration_ms > 0:
-            progress = (position_ms / player.duration_ms) * 100
-            # Set flag to prevent feedback loop when we programmatically update the slider
-            self._programmatic_update = True
+            # The slider moves in whole-percent steps, so finer changes aren't visible
+            progress = int(position_ms * 100 / player.duration_ms)
+        
+        time_str = self._format_position(position_ms)
+        if (self._idle_draw_id is None and time_str == self._last_time_str
+                and progress in (None, self._last_slider_value)):
+            return  # Nothing visible would change
+        
+        self._pending_position = (time_str, progress)
+        if self._idle_draw_id is None:
+            self._idle_draw_id = GLib.idle_add(
+                self._flush_position_draw, priority=GLib.PRIORITY_DEFAULT_IDLE)
+    
+    def _flush_position_draw(self):
+        """Write the latest queued position to the widgets."""
+        self._idle_draw_id = None
+        time_str, progress = self._pending_position
+        
+        if time_str != self._last_time_str:
+            self._last_time_str = time_str
+            self.current_time_label.set_label(time_str)
+        
+        if progress is not None and progress != self._last_slider_value:
+            self._last_slider_value = progress
+            self.timeline_slider.handler_block(self._timeline_handler_id)
             self.timeline_slider.set_value(progress)
-            self._programmatic_update = False
+            self.timeline_slider.handler_unblock(self._timeline_handler_id)
+        return False  # Don't repeat
     
-    def _on_track_toggled(self, check, track_index):
+    def _on_track_toggled(self, check, list_item):
         """Handle track toggle."""
-        self.app.midi_player.set_track_enabled(track_index, check.get_active())
+        item = list_item.get_item()
+        enabled = check.get_active()
+        if item is None or item.enabled == enabled:
+            return  # Row is being bound, not toggled by the user
+        item.enabled = enabled
+        self.app.midi_player.set_track_enabled(item.index, enabled)
+        
+        # Keep the snapshot in sync so the next update_tracks() leaves this row alone
+        pos = list_item.get_position()
+        if pos < len(self._last_tracks_snapshot):
+            index, name, _, note_count = self._last_tracks_snapshot[pos]
+            self._last_tracks_snapshot[pos] = (index, name, enabled, note_count)
     
     def _on_timeline_changed(self, slider):
         """Handle timeline slider change."""
-        # Ignore programmatic updates to prevent feedback loop
-        if self._programmatic_update:
-            return
-        
         player = self.app.midi_player
         if player.duration_ms > 0:
             position_ms = (slider.get_value() / 100) * player.duration_ms
             player.seek(position_ms)
-            self.current_time_label.set_label(player.format_time(position_ms))
+            self._last_slider_value = int(slider.get_value())
+            self._last_time_str = self._format_position(position_ms)
+            self.current_time_label.set_label(self._last_time_str)
     
     def _on_speed_changed(self, slider):
         """Handle speed slider change."""
@@ -310,14 +420,12 @@ class PlayerTab(Gtk.Box):
             player.play()
             self.play_button.set_icon_name('media-playback-pause-symbolic')
             self.play_button.set_tooltip_text('Pause')
-            self._start_update_timer()
     
     def _on_stop_clicked(self, button):
         """Handle stop button click."""
         self.app.midi_player.stop()
         self.play_button.set_icon_name('media-playback-start-symbolic')
         self.play_button.set_tooltip_text('Play')
-        self._stop_update_timer()
         self._update_position(0)
     
     def _on_prev_clicked(self, button):
@@ -331,29 +439,17 @@ class PlayerTab(Gtk.Box):
         # Go to next in playlist (if implemented)
         pass
     
-    def _start_update_timer(self):
-        """Start the position update timer."""
-        if self._update_timer_id is None:
-            self._update_timer_id = GLib.timeout_add(100, self._timer_callback)
-    
-    def _stop_update_timer(self):
-        """Stop the position update timer."""
-        if self._update_timer_id is not None:
-            GLib.source_remove(self._update_timer_id)
-            self._update_timer_id = None
+    def on_position_changed(self, position_ms):
+        """Called from the playback thread as the position advances."""
+        GLib.idle_add(self._on_position_tick, position_ms,
+                      priority=GLib.PRIORITY_DEFAULT_IDLE)
     
-    def _timer_callback(self):
-        """Timer callback for updating UI."""
-        player = self.app.midi_player
-        
-        if player.is_playing or player.is_paused:
-            self._update_position(player.current_position_ms)
-            return True
-        else:
-            self.play_button.set_icon_name('media-playback-start-symbolic')
-            self.play_button.set_tooltip_text('Play')
-            self._update_timer_id = None
-            return False
+    def _on_position_tick(self, position_ms):
+        """Apply a position tick on the main thread."""
+        # Drop ticks that were queued before a stop or pause
+        if self.app.midi_player.is_playing:
+            self._update_position(position_ms)
+        return False
     
     def on_playback_finished(self):
         """Called when playback finishes."""
@@ -363,49 +459,54 @@ class PlayerTab(Gtk.Box):
         """UI update when playback finishes."""
         self.play_button.set_icon_name('media-playback-start-symbolic')
         self.play_button.set_tooltip_text('Play')
-        self._stop_update_timer()
         self._update_position(0)
         # Clear all key highlights
         self._clear_all_highlights()
     
-    def highlight_key(self, midi_note: int):
-        """Highlight a key when its note is played."""
-        # Handle transposition by checking nearby notes
-        key_mapper = self.app.key_mapper
-        transpose = key_mapper.transpose
-        
-        # The actual note being searched for
-        actual_note = midi_note
-        
-        # Try to find the button for this note (accounting for clamping)
-        btn = self.key_buttons.get(actual_note)
-        
-        if not btn:
-            # Try clamping like the midi player does
-            while actual_note > 83:
-                actual_note -= 12
-            while actual_note < 48:
-                actual_note += 12
-            btn = self.key_buttons.get(actual_note)
-        
-        if btn:
-            btn.add_css_class('suggested-action')
-            # Remove highlight after 200ms
-            GLib.timeout_add(200, self._unhighlight_key, actual_note)
+    def _flush_highlights(self):
+        """Highlight every note queued since the last flush in one pass."""
+        with self._pending_lock:
+            notes = frozenset(self._pending_notes)
+            self._pending_notes.clear()
+            self._highlight_flush_id = None
+        
+        note_to_btn = self._note_to_btn
+        buttons = {note_to_btn[midi_note] for midi_note in notes} - {None}
+        if not buttons:
+            return False
+        
+        self._highlight_serial += 1
+        serial = self._highlight_serial
+        lit_serial = self._lit_serial
+        for btn in buttons:
+            btn.set_state_flags(Gtk.StateFlags.CHECKED, False)
+            lit_serial[btn] = serial
+        # Remove the whole batch's highlight after 200ms
+        GLib.timeout_add(200, self._clear_batch, serial, buttons,
+                         priority=GLib.PRIORITY_LOW)
+        return False  # Don't repeat
     
-    def _unhighlight_key(self, midi_note: int):
-        """Remove highlight from a key."""
-        btn = self.key_buttons.get(midi_note)
-        if btn:
-            btn.remove_css_class('suggested-action')
+    def _clear_batch(self, serial, buttons):
+        """Remove highlight from a batch of keys not re-lit by a later batch."""
+        lit_serial = self._lit_serial
+        for btn in buttons:
+            if lit_serial.get(btn) == serial:
+                del lit_serial[btn]
+                btn.unset_state_flags(Gtk.StateFlags.CHECKED)
         return False  # Don't repeat
     
     def _clear_all_highlights(self):
         """Clear all key highlights."""
+        self._lit_serial.clear()
         for midi_note, btn in self.key_buttons.items():
-            btn.remove_css_class('suggested-action')
+            btn.unset_state_flags(Gtk.StateFlags.CHECKED)
     
     def on_note_played(self, note):
         """Called when a note is played - highlight the corresponding key."""
-        GLib.idle_add(self.highlight_key, note.note)
+        with self._pending_lock:
+            self._pending_notes.add(note.note)
+            if self._highlight_flush_id is None:
+                # Cosmetic, so let input and control callbacks run first
+                self._highlight_flush_id = GLib.idle_add(
+                    self._flush_highlights, priority=GLib.PRIORITY_LOW)
 
@@ -3,267 +3,128 @@ Settings Tab for Genshin Lyre MIDI Player.
 Contains configuration options for playback and display.
 """
 
+import os
+
 import gi
-import webbrowser
 gi.require_version('Gtk', '4.0')
-from gi.repository import Gtk, Adw, Gio
+from gi.repository import Gtk, Adw, Gio, GLib
 
 from ..key_mapper import KeyMapper
 
+# GtkBuilder template holding the tab's widget tree
+_UI_PATH = os.path.join(os.path.dirname(__file__), 'settings_tab.ui')
+
+# Where the "Appreciate My Work" button leads
+APPRECIATE_URL = 'https://www.paypal.com/paypalme/GTCxprice1'
+
+# Layout names in dropdown order, and each name's position
+_LAYOUTS = tuple(KeyMapper.get_available_layouts())
+_LAYOUT_INDEX = {name: i for i, name in enumerate(_LAYOUTS)}
+
 
-class SettingsTab(Gtk.Box):
+@Gtk.Template(filename=_UI_PATH)
+class SettingsTab(Adw.PreferencesPage):
     """Settings tab with configuration options."""
+    __gtype_name__ = 'SettingsTab'
+    
+    layout_dropdown = Gtk.Template.Child()
+    transpose_spin = Gtk.Template.Child()
+    merge_switch = Gtk.Template.Child()
+    threshold_spin = Gtk.Template.Child()
+    hold_switch = Gtk.Template.Child()
+    focus_switch = Gtk.Template.Child()
+    theme_switch = Gtk.Template.Child()
     
     def __init__(self, app):
-        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=16)
+        super().__init__()
         self.app = app
-        self.set_margin_top(16)
-        self.set_margin_bottom(16)
-        self.set_margin_start(16)
-        self.set_margin_end(16)
+        
+        # (widget, property, settings key, to_widget, handler id) for every bound control
+        self._bindings = []
         
         self._build_ui()
+        self._bind_settings()
         self._load_settings()
     
     def _build_ui(self):
-        """Build the settings UI."""
-        # Keyboard Settings Group
-        keyboard_group = self._create_group("Keyboard Settings")
-        
-        # Keyboard Layout
-        layout_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-        layout_label = Gtk.Label(label="Keyboard Layout")
-        layout_label.set_hexpand(True)
-        layout_label.set_xalign(0)
-        layout_row.append(layout_label)
-        
-        self.layout_dropdown = Gtk.DropDown.new_from_strings(
-            KeyMapper.get_available_layouts()
+        """Fill in the parts of the UI the template can't know."""
+        # Widgets come from settings_tab.ui; values are filled in by _load_settings
+        self.layout_dropdown.set_model(Gtk.StringList.new(list(_LAYOUTS)))
+    
+    def _bind_settings(self):
+        """Bind each control's property to its settings key."""
+        self._bind_setting(
+            self.layout_dropdown, 'selected', 'keyboard_layout',
+            to_widget=lambda name: _LAYOUT_INDEX.get(name, 0),
+            from_widget=lambda index: _LAYOUTS[index] if index < len(_LAYOUTS) else None
+        )
+        self._bind_setting(self.transpose_spin, 'value', 'transpose', from_widget=int)
+        self._bind_setting(self.merge_switch, 'active', 'merge_nearby_notes')
+        self._bind_setting(self.threshold_spin, 'value', 'merge_threshold_ms', from_widget=int)
+        self._bind_setting(self.hold_switch, 'active', 'hold_notes')
+        self._bind_setting(self.focus_switch, 'active', 'auto_focus_genshin')
+        self._bind_setting(
+            self.theme_switch, 'active', 'theme',
+            to_widget=lambda theme: theme == 'dark',
+            from_widget=lambda active: 'dark' if active else 'light'
         )
-        self.layout_dropdown.connect('notify::selected', self._on_layout_changed)
-        layout_row.append(self.layout_dropdown)
-        keyboard_group.append(layout_row)
-        
-        # Transpose
-        transpose_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-        transpose_label = Gtk.Label(label="Transpose (semitones)")
-        transpose_label.set_hexpand(True)
-        transpose_label.set_xalign(0)
-        transpose_row.append(transpose_label)
-        
-        self.transpose_spin = Gtk.SpinButton.new_with_range(-12, 12, 1)
-        self.transpose_spin.set_value(0)
-        self.transpose_spin.connect('value-changed', self._on_transpose_changed)
-        transpose_row.append(self.transpose_spin)
-        keyboard_group.append(transpose_row)
-        
-        self.append(keyboard_group)
-        
-        # Playback Settings Group
-        playback_group = self._create_group("Playback Settings")
-        
-        # Merge Nearby Notes
-        merge_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-        merge_label = Gtk.Label(label="Merge Nearby Notes")
-        merge_label.set_hexpand(True)
-        merge_label.set_xalign(0)
-        merge_row.append(merge_label)
-        
-        self.merge_switch = Gtk.Switch()
-        self.merge_switch.set_valign(Gtk.Align.CENTER)
-        self.merge_switch.connect('notify::active', self._on_merge_changed)
-        merge_row.append(self.merge_switch)
-        playback_group.append(merge_row)
-        
-        # Merge Threshold
-        threshold_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-        threshold_label = Gtk.Label(label="Merge Threshold (ms)")
-        threshold_label.set_hexpand(True)
-        threshold_label.set_xalign(0)
-        threshold_row.append(threshold_label)
-        
-        self.threshold_spin = Gtk.SpinButton.new_with_range(10, 200, 10)
-        self.threshold_spin.set_value(50)
-        self.threshold_spin.connect('value-changed', self._on_threshold_changed)
-        threshold_row.append(self.threshold_spin)
-        playback_group.append(threshold_row)
-        
-        # Hold Notes
-        hold_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-        hold_label = Gtk.Label(label="Hold Notes")
-        hold_label.set_hexpand(True)
-        hold_label.set_xalign(0)
-        hold_row.append(hold_label)
-        
-        self.hold_switch = Gtk.Switch()
-        self.hold_switch.set_valign(Gtk.Align.CENTER)
-        self.hold_switch.connect('notify::active', self._on_hold_changed)
-        hold_row.append(self.hold_switch)
-        playback_group.append(hold_row)
-        
-        self.append(playback_group)
-        
-        # Window Settings Group
-        window_group = self._create_group("Window Settings")
-        
-        # Auto Focus Genshin
-        focus_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-        focus_label = Gtk.Label(label="Auto Focus Genshin Window")
-        focus_label.set_hexpand(True)
-        focus_label.set_xalign(0)
-        focus_row.append(focus_label)
-        
-        self.focus_switch = Gtk.Switch()
-        self.focus_switch.set_valign(Gtk.Align.CENTER)
-        self.focus_switch.connect('notify::active', self._on_focus_changed)
-        focus_row.append(self.focus_switch)
-        window_group.append(focus_row)
-        
-        # Theme
-        theme_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-        theme_label = Gtk.Label(label="Dark Theme")
-        theme_label.set_hexpand(True)
-        theme_label.set_xalign(0)
-        theme_row.append(theme_label)
-        
-        self.theme_switch = Gtk.Switch()
-        self.theme_switch.set_valign(Gtk.Align.CENTER)
-        self.theme_switch.set_active(True)
-        self.theme_switch.connect('notify::active', self._on_theme_changed)
-        theme_row.append(self.theme_switch)
-        window_group.append(theme_row)
-        
-        self.append(window_group)
-        
-        # Spacer
-        spacer = Gtk.Box()
-        spacer.set_vexpand(True)
-        self.append(spacer)
-        
-        # Appreciate My Work button
-        appreciate_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
-        appreciate_box.set_halign(Gtk.Align.CENTER)
-        appreciate_box.set_margin_bottom(8)
-        
-        appreciate_button = Gtk.Button()
-        appreciate_button.set_tooltip_text("Support the developer via PayPal")
-        appreciate_button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
-        
-        # PayPal heart icon
-        heart_label = Gtk.Label(label="💖")
-        appreciate_button_box.append(heart_label)
-        
-        appreciate_label = Gtk.Label(label="Appreciate My Work")
-        appreciate_button_box.append(appreciate_label)
-        
-        appreciate_button.set_child(appreciate_button_box)
-        appreciate_button.add_css_class('suggested-action')
-        appreciate_button.connect('clicked', self._on_appreciate_clicked)
-        appreciate_box.append(appreciate_button)
-        
-        self.append(appreciate_box)
-        
-        # Reset button
-        reset_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
-        reset_box.set_halign(Gtk.Align.CENTER)
-        
-        reset_button = Gtk.Button(label="Reset to Defaults")
-        reset_button.add_css_class('destructive-action')
-        reset_button.connect('clicked', self._on_reset_clicked)
-        reset_box.append(reset_button)
-        
-        self.append(reset_box)
     
-    def _create_group(self, title):
-        """Create a settings group with title."""
-        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
-        
-        label = Gtk.Label(label=title)
-        label.add_css_class('title-3')
-        label.set_xalign(0)
-        box.append(label)
-        
-        separator = Gtk.Separator()
-        box.append(separator)
-        
-        return box
+    def _bind_setting(self, widget, prop, key, to_widget=None, from_widget=None):
+        """
+        Write a widget property to a settings key whenever it changes.
+        
+        Args:
+            widget: Control to bind
+            prop: Name of the widget property holding the value
+            key: Settings key the value is stored under
+            to_widget: Optional conversion from the stored value to the property
+            from_widget: Optional conversion from the property to the stored value
+        """
+        handler_id = widget.connect(
+            f'notify::{prop}', self._on_bound_property_changed, key, from_widget)
+        self._bindings.append((widget, prop, key, to_widget, handler_id))
+    
+    def _on_bound_property_changed(self, widget, pspec, key, from_widget):
+        """Store a bound property's new value (the application applies its side effects)."""
+        value = widget.get_property(pspec.name)
+        if from_widget is not None:
+            value = from_widget(value)
+            if value is None:
+                return
+        self.app.settings.set(key, value)
     
     def _load_settings(self):
-        """Load settings from storage."""
+        """Load settings from storage into the bound controls."""
         settings = self.app.settings
-        
-        # Layout
-        layouts = KeyMapper.get_available_layouts()
-        try:
-            layout_index = layouts.index(settings.keyboard_layout)
-            self.layout_dropdown.set_selected(layout_index)
-        except ValueError:
-            self.layout_dropdown.set_selected(0)
-        
-        # Transpose
-        self.transpose_spin.set_value(settings.transpose)
-        
-        # Merge
-        self.merge_switch.set_active(settings.merge_nearby_notes)
-        self.threshold_spin.set_value(settings.get('merge_threshold_ms', 50))
-        
-        # Hold notes
-        self.hold_switch.set_active(settings.get('hold_notes', False))
-        
-        # Auto focus
-        self.focus_switch.set_active(settings.get('auto_focus_genshin', True))
-        
-        # Theme
-        self.theme_switch.set_active(settings.theme == 'dark')
-    
-    def _on_layout_changed(self, dropdown, param):
-        """Handle layout change."""
-        layouts = KeyMapper.get_available_layouts()
-        selected = dropdown.get_selected()
-        if 0 <= selected < len(layouts):
-            layout = layouts[selected]
-            self.app.settings.keyboard_layout = layout
-            self.app.key_mapper.set_layout(layout)
-    
-    def _on_transpose_changed(self, spin):
-        """Handle transpose change."""
-        value = int(spin.get_value())
-        self.app.settings.transpose = value
-        self.app.key_mapper.set_transpose(value)
-    
-    def _on_merge_changed(self, switch, param):
-        """Handle merge toggle."""
-        active = switch.get_active()
-        self.app.settings.merge_nearby_notes = active
-        threshold = self.threshold_spin.get_value()
-        self.app.midi_player.set_merge_enabled(active, threshold)
-    
-    def _on_threshold_changed(self, spin):
-        """Handle merge threshold change."""
-        value = spin.get_value()
-        self.app.settings.set('merge_threshold_ms', value)
-        if self.merge_switch.get_active():
-            self.app.midi_player.set_merge_enabled(True, value)
-    
-    def _on_hold_changed(self, switch, param):
-        """Handle hold notes toggle."""
-        self.app.settings.set('hold_notes', switch.get_active())
-    
-    def _on_focus_changed(self, switch, param):
-        """Handle auto focus toggle."""
-        self.app.settings.set('auto_focus_genshin', switch.get_active())
-    
-    def _on_theme_changed(self, switch, param):
-        """Handle theme toggle."""
-        theme = 'dark' if switch.get_active() else 'light'
-        self.app.settings.theme = theme
-        self.app.apply_theme(theme)
+        for widget, prop, key, to_widget, handler_id in self._bindings:
+            value = settings.get(key, settings.DEFAULT_SETTINGS[key])
+            # The value came from settings, so don't write it straight back
+            widget.handler_block(handler_id)
+            widget.set_property(prop, to_widget(value) if to_widget else value)
+            widget.handler_unblock(handler_id)
     
+    @Gtk.Template.Callback()
     def _on_reset_clicked(self, button):
         """Handle reset button click."""
         self.app.settings.reset()
         self._load_settings()
     
+    @Gtk.Template.Callback()
     def _on_appreciate_clicked(self, button):
         """Handle appreciate button click - opens PayPal link."""
-        webbrowser.open('https://www.paypal.com/paypalme/GTCxprice1')
+        # Both launchers hand off asynchronously, so the UI doesn't wait on xdg-open
+        if hasattr(Gtk, 'UriLauncher'):  # GTK 4.10+
+            launcher = Gtk.UriLauncher.new(APPRECIATE_URL)
+            launcher.launch(self.get_root(), None, self._on_uri_launched, launcher.launch_finish)
+        else:
+            Gio.AppInfo.launch_default_for_uri_async(
+                APPRECIATE_URL, None, None,
+                self._on_uri_launched, Gio.AppInfo.launch_default_for_uri_finish
+            )
+    
+    def _on_uri_launched(self, source, result, finish):
+        """Report a failed browser launch."""
+        try:
+            finish(result)
+        except GLib.Error as e:
+            print(f"Error opening link: {e.message}")
@@ -0,0 +1,27 @@
+"""Tests for KeyMapper's note-to-key tables."""
+
+import pytest
+
+from genshin_lyre.key_mapper import (
+    BASE_NOTE_MAP, KEYBOARD_LAYOUTS, MAX_MIDI_NOTE, MIDI_NOTE_COUNT, MIN_MIDI_NOTE, KeyMapper,
+)
+
+
+def _folded_key(keys, note, transpose):
+    """Brute-force clamped lookup: fold the sounding pitch into the lyre's range."""
+    pitch = note + transpose
+    while pitch > MAX_MIDI_NOTE:
+        pitch -= 12
+    while pitch < MIN_MIDI_NOTE:
+        pitch += 12
+    index = BASE_NOTE_MAP.get(pitch)
+    return keys[index] if index is not None else None
+
+
+@pytest.mark.parametrize('transpose', range(-12, 13))
+@pytest.mark.parametrize('layout', list(KEYBOARD_LAYOUTS))
+def test_clamped_lookup_matches_brute_force_fold(layout, transpose):
+    mapper = KeyMapper(layout, transpose)
+    keys = KEYBOARD_LAYOUTS[layout]
+    for note in range(MIDI_NOTE_COUNT):
+        assert mapper.get_key(note, clamp=True) == _folded_key(keys, note, transpose), note